@@ -0,0 +1,68 @@
+"""Benchmark SheetColumns, ExpiryStats and ExpiryIndex on a synthetic sheet.
+
+Usage:
+    python -m benchmarks.bench_expiry_stats [rows]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# bot.config refuses to import without these; the benchmark never talks to Telegram or Sheets
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', 'benchmark')
+os.environ.setdefault('GOOGLE_SHEET_ID', 'benchmark')
+
+from bot.config import TIMEZONE
+from bot.expiry_index import ExpiryIndex
+from bot.expiry_stats import ExpiryStats
+from bot.sheet_columns import SheetColumns
+from bot.snapshot_store import SheetSnapshot
+
+
+def build_snapshot(row_count: int) -> SheetSnapshot:
+    rng = random.Random(42)
+    now = datetime.now(TIMEZONE)
+    rows = [['Email', 'Password', 'Type', 'D', 'E', 'F', 'Renewed', 'Days', 'Time']]
+    for i in range(row_count):
+        renewed = now - timedelta(days=rng.randint(0, 60))
+        rows.append([
+            f"user{i}@example.com",
+            'secret',
+            'copilot' if rng.random() < 0.3 else '365',
+            '', '', '',
+            renewed.strftime('%Y-%m-%d'),
+            str(rng.randint(-10, 40)),
+            f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00",
+        ])
+    return SheetSnapshot(rows, now)
+
+
+def timed(label: str, func, repeat: int = 5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<32} {best * 1000:9.2f} ms")
+    return result
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    snapshot = build_snapshot(row_count)
+    now = snapshot.fetched_at
+    fired_at = {f"user{i}@example.com": now - timedelta(days=1) for i in range(0, row_count, 3)}
+
+    print(f"Rows: {row_count}")
+    # Fresh columns each time, so the lazily parsed /stats columns are included where they are paid for
+    timed("SheetColumns parse", lambda: SheetColumns(snapshot))
+    index = timed("Scan: columns + index", lambda: ExpiryIndex(SheetColumns(snapshot)))
+    stats = timed("/stats: columns + stats", lambda: ExpiryStats(SheetColumns(snapshot), fired_at))
+    timed("ExpiryStats format", lambda: stats.format_message([]))
+    timed("ExpiryIndex 6h query", lambda: index.between(now, now + timedelta(hours=6)), repeat=1000)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,116 @@
+import hashlib
 import logging
-from datetime import datetime
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
-from bot.config import TIMEZONE
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from bot.config import TIMEZONE, SNAPSHOT_FILE, CHECK_INTERVAL_MINUTES
 from bot.sheets_manager import SheetsManager
+from bot.snapshot_store import SnapshotStore
+from bot.sheet_columns import SheetColumns, parse_renewal_date
+from bot.expiry_index import ExpiryIndex
+from bot.expiry_stats import ExpiryStats
 
 logger = logging.getLogger(__name__)
 
+DONE_CALLBACK_PREFIX = 'done'
+UPCOMING_CALLBACK_PREFIX = 'upcoming'
+UPCOMING_PAGE_SIZE = 20
+UPCOMING_QUERY_CACHE_SIZE = 32  # /upcoming queries whose pages can still be flipped without refetching
+BACKLOG_HISTORY_SIZE = 200  # ~2 days of 15-minute scans
+
 class AlertManager:
     def __init__(self, sheets_manager: SheetsManager):
         self.sheets_manager = sheets_manager
         self.alert_tracking = {}  # message_id -> row_index
         self.email_messages = {}  # email -> [(chat_id, message_id)]
+        self.snapshot_store = SnapshotStore(SNAPSHOT_FILE)
+        self.snapshot = self.snapshot_store.load()
+        self.columns = SheetColumns(self.snapshot) if self.snapshot else None
+        self.expiry_index = ExpiryIndex(self.columns) if self.columns else None
+        # Monotonic times: a write that finishes after a fetch started makes that snapshot outdated.
+        # Writes may run in a worker thread, so these are only ever assigned, never read-modify-written.
+        self.snapshot_requested_at = 0.0
+        self.last_write_at = 0.0
+        self.alert_fired_at = {}  # email (lowercase) -> when its current alert first fired
+        self.backlog_history = deque(maxlen=BACKLOG_HISTORY_SIZE)  # (scan time, alert count)
+        self._stats = None
+        self.upcoming_queries = OrderedDict()  # query start (epoch seconds) -> ExpiryIndex it ran against
+    
+    def _fetch_rows(self) -> Tuple[List[List[str]], bool]:
+        """Fetch A:I from the sheet, falling back to the last snapshot if Sheets is unavailable.
+        Returns (rows, stale)."""
+        requested_at = time.monotonic()
+        try:
+            data = self.sheets_manager.get_sheet_data('A:I')
+        except Exception as error:
+            if self.snapshot is None:
+                raise
+            logger.warning(f"Sheets unavailable ({error}), using snapshot from "
+                           f"{self.snapshot.fetched_at.strftime('%Y-%m-%d %H:%M:%S')}")
+            return self.snapshot.rows, True
+        
+        self.snapshot = self.snapshot_store.save(data)
+        self.snapshot_requested_at = requested_at
+        # Parse the columns once per snapshot; the index and the stats share them
+        self.columns = SheetColumns(self.snapshot)
+        self.expiry_index = ExpiryIndex(self.columns)
+        return data, False
+    
+    def _refresh_snapshot(self):
+        """Refetch when the snapshot is missing, older than one check interval or outdated by our own writes.
+        Quiet hours and missing groups skip the scheduled scan, so queries can't rely on it."""
+        if (self.snapshot is not None and self.last_write_at <= self.snapshot_requested_at and
+                datetime.now(TIMEZONE) - self.snapshot.fetched_at <= timedelta(minutes=CHECK_INTERVAL_MINUTES)):
+            return
+        # Falls back to the cached snapshot if Sheets is unavailable
+        self._fetch_rows()
+    
+    def get_upcoming(self, window: timedelta, query_start: Optional[int] = None) -> Tuple[List[Dict[str, any]], int, datetime]:
+        """Rows expiring in [query start, query start + window).
+        A new query refreshes the snapshot and pins its index; paging passes the original query_start
+        and reuses that index and start time, so pages never refetch or shift.
+        Returns (entries, query_start, data fetched_at)."""
+        if query_start is None:
+            self._refresh_snapshot()
+            query_start = int(datetime.now(TIMEZONE).timestamp())
+            index = self.expiry_index
+            self.upcoming_queries[query_start] = index
+            self.upcoming_queries.move_to_end(query_start)
+            while len(self.upcoming_queries) > UPCOMING_QUERY_CACHE_SIZE:
+                self.upcoming_queries.popitem(last=False)
+        else:
+            # Queries evicted from the cache (or from before a restart) page over the current index
+            index = self.upcoming_queries.get(query_start) or self.expiry_index
+            if index is None:
+                raise ValueError("No sheet data loaded yet")
+        
+        start = datetime.fromtimestamp(query_start, TIMEZONE)
+        return index.between(start, start + window), query_start, index.fetched_at
+    
+    def get_stats(self) -> ExpiryStats:
+        """Expiry analytics for the latest snapshot, computed once per snapshot"""
+        self._refresh_snapshot()
+        if self._stats is None or self._stats.fetched_at != self.snapshot.fetched_at:
+            self._stats = ExpiryStats(self.columns, self.alert_fired_at)
+        return self._stats
+    
+    def format_stats_message(self) -> str:
+        return self.get_stats().format_message(self.backlog_history)
+    
+    def _days_since_fetch(self, current_time: datetime) -> int:
+        """H is "days remaining" as of the snapshot date; this shifts cached H values to today"""
+        return (current_time.date() - self.snapshot.fetched_at.date()).days
     
     def check_for_alerts(self) -> List[Dict[str, any]]:
         alerts = []
         try:
-            data = self.sheets_manager.get_sheet_data('A:I')
+            data, stale = self._fetch_rows()
             current_time = datetime.now(TIMEZONE)
             current_time_str = current_time.strftime('%H:%M:%S')
+            days_since_fetch = self._days_since_fetch(current_time) if stale else 0
+            unparsed_renewal_dates = 0
             
             logger.info(f"Checking {len(data)} rows at {current_time_str}")
             
@@ -38,7 +131,7 @@ class AlertManager:
                     continue
                 
                 try:
-                    h_value = int(h_value_str)
+                    h_value = int(h_value_str) - days_since_fetch
                 except (ValueError, TypeError):
                     continue
                 
@@ -48,11 +141,25 @@ class AlertManager:
                         'email': email,
                         'password': password,
                         'c_column': c_column,
-                        'expiry_time': i_time
+                        'expiry_time': i_time,
+                        'stale': stale
                     }
                     alerts.append(alert)
+                    
+                    # A renewal on or after the recorded firing means this is a new alert cycle
+                    email_key = email.strip().lower()
+                    fired_at = self.alert_fired_at.get(email_key)
+                    renewed_on = parse_renewal_date(row[6])
+                    if renewed_on is None and row[6].strip():
+                        unparsed_renewal_dates += 1
+                    if fired_at is None or (renewed_on is not None and renewed_on >= fired_at.date()):
+                        self.alert_fired_at[email_key] = current_time
                     logger.info(f"Alert triggered for row {idx}: {email}, H={h_value}, Time={i_time}")
             
+            if not stale:
+                self.backlog_history.append((current_time, len(alerts)))
+            if unparsed_renewal_dates:
+                logger.warning(f"{unparsed_renewal_dates} alerting rows have a non-ISO date in column G")
             logger.info(f"Found {len(alerts)} alerts to send")
             return alerts
             
@@ -64,9 +171,10 @@ class AlertManager:
         """Check for all expired accounts (H <= 0) regardless of time for daily summary"""
         alerts = []
         try:
-            data = self.sheets_manager.get_sheet_data('A:I')
+            data, stale = self._fetch_rows()
             current_time = datetime.now(TIMEZONE)
             current_time_str = current_time.strftime('%H:%M:%S')
+            days_since_fetch = self._days_since_fetch(current_time) if stale else 0
             
             logger.info(f"Running daily summary check for {len(data)} rows at {current_time_str}")
             
@@ -87,7 +195,7 @@ class AlertManager:
                     continue
                 
                 try:
-                    h_value = int(h_value_str)
+                    h_value = int(h_value_str) - days_since_fetch
                 except (ValueError, TypeError):
                     continue
                 
@@ -99,7 +207,8 @@ class AlertManager:
                         'password': password,
                         'c_column': c_column,
                         'expiry_time': i_time,
-                        'days_remaining': h_value
+                        'days_remaining': h_value,
+                        'stale': stale
                     }
                     alerts.append(alert)
                     logger.info(f"Daily summary: row {idx}: {email}, H={h_value}, Time={i_time}")
@@ -127,8 +236,15 @@ class AlertManager:
         message += f"Password: `{password}`\n"
         message += f"Giờ hết hạn: {expiry_time}"
         
+        if alert.get('stale'):
+            message += f"\n{self.format_stale_notice()}"
+        
         return message
     
+    def format_stale_notice(self) -> str:
+        fetched_at = self.snapshot.fetched_at.strftime('%Y-%m-%d %H:%M:%S') if self.snapshot else 'unknown'
+        return f"⚠️ Sheet unavailable - using cached data from {fetched_at}"
+    
     def format_daily_summary_message(self, alerts: List[Dict[str, any]]) -> str:
         """Format daily summary message with all expired accounts"""
         if not alerts:
@@ -137,6 +253,8 @@ class AlertManager:
         current_date = datetime.now(TIMEZONE).strftime('%Y-%m-%d')
         message = f"📊 Daily Summary - {current_date}\n"
         message += f"Total expired accounts: {len(alerts)}\n"
+        if alerts[0].get('stale'):
+            message += f"{self.format_stale_notice()}\n"
         message += "=" * 30 + "\n\n"
         
         # Group by type (Copilot vs 365)
@@ -165,6 +283,70 @@ class AlertManager:
         
         return message
     
+    def make_fingerprint(self, email: str) -> str:
+        """Short content fingerprint used to check a row still holds the same account"""
+        return hashlib.sha1(email.strip().lower().encode('utf-8')).hexdigest()[:10]
+    
+    def build_done_keyboard(self, alert: Dict[str, any]) -> InlineKeyboardMarkup:
+        """Build the inline "Done" button for an alert (callback data: done:<row>:<fingerprint>)"""
+        fingerprint = self.make_fingerprint(alert['email'])
+        callback_data = f"{DONE_CALLBACK_PREFIX}:{alert['row_index']}:{fingerprint}"
+        return InlineKeyboardMarkup([[InlineKeyboardButton("✅ Done", callback_data=callback_data)]])
+    
+    def parse_done_callback(self, data: Optional[str]) -> Optional[Tuple[int, str]]:
+        """Parse callback data built by build_done_keyboard into (row_index, fingerprint)"""
+        if not data:
+            return None
+        parts = data.split(':')
+        if len(parts) != 3 or parts[0] != DONE_CALLBACK_PREFIX:
+            return None
+        try:
+            row_index = int(parts[1])
+        except ValueError:
+            return None
+        return row_index, parts[2]
+    
+    def verify_row_fingerprint(self, row_index: int, fingerprint: str) -> Optional[bool]:
+        """Check that the row still holds the account the alert was sent for.
+        Returns None if the row could not be read."""
+        try:
+            values = self.sheets_manager.get_sheet_data(f'A{row_index}:A{row_index}')
+        except Exception as error:
+            logger.error(f"Error reading row {row_index} for fingerprint check: {error}")
+            return None
+        
+        if not values or not values[0] or not values[0][0]:
+            return False
+        return self.make_fingerprint(values[0][0]) == fingerprint
+    
+    def format_upcoming_message(self, entries: List[Dict[str, any]], window_label: str, page: int,
+                                fetched_at: datetime) -> str:
+        """Format one page of /upcoming results"""
+        total_pages = max(1, (len(entries) + UPCOMING_PAGE_SIZE - 1) // UPCOMING_PAGE_SIZE)
+        message = f"⏳ Expiring in the next {window_label}: {len(entries)}\n"
+        message += f"Data as of: {fetched_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
+        
+        if not entries:
+            return message + "\n✅ Nothing expires in this window."
+        
+        message += f"Page {page + 1}/{total_pages}\n\n"
+        for entry in entries[page * UPCOMING_PAGE_SIZE:(page + 1) * UPCOMING_PAGE_SIZE]:
+            label = "🤖" if 'copilot' in entry['c_column'].lower() else "📦"
+            message += f"{label} `{entry['email']}` - {entry['expires_at'].strftime('%m-%d %H:%M')}\n"
+        return message
+    
+    def build_upcoming_keyboard(self, total: int, window_seconds: int, query_start: int,
+                                page: int) -> Optional[InlineKeyboardMarkup]:
+        """Prev/next buttons for /upcoming (callback data: upcoming:<window_seconds>:<query_start>:<page>)"""
+        total_pages = (total + UPCOMING_PAGE_SIZE - 1) // UPCOMING_PAGE_SIZE
+        prefix = f"{UPCOMING_CALLBACK_PREFIX}:{window_seconds}:{query_start}"
+        buttons = []
+        if page > 0:
+            buttons.append(InlineKeyboardButton("◀️ Prev", callback_data=f"{prefix}:{page - 1}"))
+        if page + 1 < total_pages:
+            buttons.append(InlineKeyboardButton("Next ▶️", callback_data=f"{prefix}:{page + 1}"))
+        return InlineKeyboardMarkup([buttons]) if buttons else None
+    
     def update_row_after_done(self, row_index: int) -> bool:
         now = datetime.now(TIMEZONE)
         date_value = now.strftime('%Y-%m-%d')
@@ -173,12 +355,28 @@ class AlertManager:
         success = self.sheets_manager.update_row(row_index, date_value, time_value)
         
         if success:
+            self.last_write_at = time.monotonic()
             logger.info(f"Successfully updated row {row_index} after 'done' reply")
         else:
             logger.error(f"Failed to update row {row_index} after 'done' reply")
         
         return success
     
+    def update_rows_after_done(self, row_indices: List[int]) -> bool:
+        now = datetime.now(TIMEZONE)
+        date_value = now.strftime('%Y-%m-%d')
+        time_value = now.strftime('%H:%M:%S')
+        
+        success = self.sheets_manager.update_rows(row_indices, date_value, time_value)
+        
+        if success:
+            self.last_write_at = time.monotonic()
+            logger.info(f"Successfully updated {len(row_indices)} rows after bulk renewal")
+        else:
+            logger.error(f"Failed to update {len(row_indices)} rows after bulk renewal")
+        
+        return success
+    
     def track_alert_message(self, message_id: int, row_index: int, email: str, chat_id: int):
         self.alert_tracking[message_id] = row_index
         
@@ -203,6 +401,16 @@ class AlertManager:
                             return email
         return None
     
+    def get_email_from_message(self, message_id: int, message_text: Optional[str] = None) -> Optional[str]:
+        """Email an alert message was sent for, from tracking or (after a restart) from its text"""
+        for email, messages in self.email_messages.items():
+            if any(msg_id == message_id for _, msg_id in messages):
+                return email
+        for line in (message_text or '').splitlines():
+            if line.startswith('Email:'):
+                return line[len('Email:'):].strip().strip('`') or None
+        return None
+    
     def get_old_messages_for_email(self, email: str, chat_id: int) -> List[int]:
         """Get all message IDs for a given email in a specific chat"""
         if email not in self.email_messages:
@@ -11,6 +11,7 @@ GOOGLE_CREDENTIALS_PATH = os.getenv('GOOGLE_CREDENTIALS_PATH', './credentials/go
 TIMEZONE = pytz.timezone(os.getenv('TIMEZONE', 'Asia/Bangkok'))
 CHECK_INTERVAL_MINUTES = int(os.getenv('CHECK_INTERVAL_MINUTES', '15'))
 WHITELIST_FILE = './data/whitelist.json'
+SNAPSHOT_FILE = './data/sheet_snapshot.bin'
 
 if not TELEGRAM_BOT_TOKEN:
     raise ValueError("TELEGRAM_BOT_TOKEN is not set in environment variables")
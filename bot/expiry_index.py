@@ -0,0 +1,48 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import List, Dict
+import numpy as np
+from bot.config import TIMEZONE
+from bot.sheet_columns import SheetColumns
+
+logger = logging.getLogger(__name__)
+
+class ExpiryIndex:
+    """Rows sorted by absolute expiry time (snapshot date + H days at time I) for range queries"""
+
+    def __init__(self, columns: SheetColumns):
+        self.fetched_at = columns.fetched_at
+        self.columns = columns
+        base_date = columns.fetched_at.date()
+        # Rows whose H lands outside the calendar (typos like 12345678901) can never fall in a query window
+        in_calendar = ((columns.h_days > date.min.toordinal() - base_date.toordinal()) &
+                       (columns.h_days < date.max.toordinal() - base_date.toordinal()))
+        positions = np.flatnonzero(columns.valid & in_calendar)
+
+        # Localize each distinct expiry day's midnight once, then add the I time to every row
+        unique_days, day_of_row = np.unique(columns.h_days[positions], return_inverse=True)
+        midnights = np.array([
+            TIMEZONE.localize(datetime.combine(base_date + timedelta(days=int(days)), datetime.min.time())).timestamp()
+            for days in unique_days
+        ], dtype=np.float64)
+        timestamps = midnights[day_of_row] + columns.i_seconds[positions] if len(positions) else np.empty(0)
+
+        order = np.argsort(timestamps, kind='stable')
+        self.timestamps = timestamps[order]
+        self.positions = positions[order]
+        logger.info(f"Built expiry index with {len(self.positions)} rows")
+
+    def between(self, start: datetime, end: datetime) -> List[Dict[str, any]]:
+        """Return rows expiring in [start, end), ordered by expiry"""
+        lo = int(np.searchsorted(self.timestamps, start.timestamp(), side='left'))
+        hi = int(np.searchsorted(self.timestamps, end.timestamp(), side='left'))
+        columns = self.columns
+        return [
+            {
+                'row_index': int(columns.row_index[pos]),
+                'email': str(columns.emails[pos]),
+                'c_column': str(columns.c_values[pos]),
+                'expires_at': datetime.fromtimestamp(float(timestamp), TIMEZONE)
+            }
+            for timestamp, pos in zip(self.timestamps[lo:hi], self.positions[lo:hi])
+        ]
@@ -0,0 +1,113 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict
+import numpy as np
+from bot.config import TIMEZONE
+from bot.sheet_columns import SheetColumns
+
+logger = logging.getLogger(__name__)
+
+STATS_HORIZON_DAYS = 30
+OVERDUE_BUCKETS = [(0, 0, "today"), (1, 2, "1-2 days"), (3, 6, "3-6 days"), (7, None, "7+ days")]
+
+class ExpiryStats:
+    """Capacity, renewal lag and backlog numbers for one snapshot, computed with NumPy arrays"""
+
+    def __init__(self, columns: SheetColumns, alert_fired_at: Dict[str, datetime]):
+        self.fetched_at = columns.fetched_at
+        n = len(columns.valid)
+        valid = columns.valid
+        h_days = columns.h_days
+        i_seconds = columns.i_seconds
+        g_days = columns.g_days
+        is_copilot = columns.is_copilot
+        fired_ts = columns.lookup_times(alert_fired_at)
+        self.unparsed_renewal_dates = columns.unparsed_renewal_dates
+
+        now_seconds = self.fetched_at.hour * 3600 + self.fetched_at.minute * 60 + self.fetched_at.second
+        copilot = valid & is_copilot
+        office = valid & ~is_copilot
+
+        # Backlog uses the same condition as check_for_alerts
+        expired = valid & ((h_days < 0) | ((h_days == 0) & (i_seconds < now_seconds)))
+
+        # Seats expiring per day over the horizon (day 0 = snapshot date); already-expired rows are backlog, not capacity
+        upcoming = valid & ~expired & (h_days >= 0) & (h_days < STATS_HORIZON_DAYS)
+        self.copilot_per_day = np.bincount(h_days[upcoming & is_copilot], minlength=STATS_HORIZON_DAYS)
+        self.office_per_day = np.bincount(h_days[upcoming & ~is_copilot], minlength=STATS_HORIZON_DAYS)
+
+        self.backlog_copilot = int(np.count_nonzero(expired & copilot))
+        self.backlog_office = int(np.count_nonzero(expired & office))
+        overdue_days = -h_days[expired]
+        self.overdue_buckets = []
+        for low, high, label in OVERDUE_BUCKETS:
+            in_bucket = overdue_days >= low if high is None else (overdue_days >= low) & (overdue_days <= high)
+            self.overdue_buckets.append((label, int(np.count_nonzero(in_bucket))))
+
+        # Renewal lag: time of last renewal (G date + I time, as written by update_row) minus when the alert fired
+        tz_offset = self.fetched_at.utcoffset().total_seconds()
+        renewed_ts = g_days.astype(np.float64) * 86400 + i_seconds - tz_offset
+        lag = renewed_ts - fired_ts
+        lag = lag[valid & ~expired & (g_days >= 0) & (lag >= 0)]
+        self.renewal_count = int(lag.size)
+        self.renewal_lag_median = float(np.median(lag)) if lag.size else None
+        self.renewal_lag_p90 = float(np.percentile(lag, 90)) if lag.size else None
+
+        if self.unparsed_renewal_dates:
+            logger.warning(f"{self.unparsed_renewal_dates} rows have a non-ISO date in column G; "
+                           f"they are left out of renewal lag")
+        logger.info(f"Computed expiry stats for {n} rows")
+
+    def format_message(self, backlog_history) -> str:
+        current_date = self.fetched_at.strftime('%Y-%m-%d')
+        message = f"📈 Expiry Stats - {current_date}\n"
+        message += f"Data as of: {self.fetched_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
+        message += "=" * 30 + "\n\n"
+
+        message += f"Backlog (expired, not renewed): {self.backlog_copilot + self.backlog_office}\n"
+        message += f"🤖 Copilot: {self.backlog_copilot} | 📦 365: {self.backlog_office}\n"
+        for label, count in self.overdue_buckets:
+            message += f"• Overdue {label}: {count}\n"
+
+        trend = self._format_trend(backlog_history)
+        if trend:
+            message += trend
+        message += "\n"
+
+        message += f"Expiring per day (next {STATS_HORIZON_DAYS} days, 🤖/📦):\n"
+        for day in np.flatnonzero(self.copilot_per_day + self.office_per_day):
+            date_label = (self.fetched_at + timedelta(days=int(day))).strftime('%m-%d')
+            message += f"• {date_label}: {self.copilot_per_day[day]}/{self.office_per_day[day]}\n"
+        message += f"Total: {int(self.copilot_per_day.sum())}/{int(self.office_per_day.sum())}\n\n"
+
+        if self.renewal_count:
+            message += f"Renewal lag ({self.renewal_count} renewals since alert):\n"
+            message += f"• Median: {self._format_duration(self.renewal_lag_median)}\n"
+            message += f"• P90: {self._format_duration(self.renewal_lag_p90)}\n"
+        else:
+            message += "Renewal lag: no renewals tracked since last restart\n"
+        if self.unparsed_renewal_dates:
+            message += f"⚠️ {self.unparsed_renewal_dates} rows have an unreadable date in column G (expected YYYY-MM-DD)\n"
+
+        return message
+
+    def _format_trend(self, backlog_history) -> str:
+        """Compare the current backlog with the oldest scan within the last 24 hours"""
+        if not backlog_history:
+            return ''
+        cutoff = datetime.now(TIMEZONE) - timedelta(hours=24)
+        past = next(((at, count) for at, count in backlog_history if at >= cutoff), None)
+        if past is None:
+            return ''
+        change = self.backlog_copilot + self.backlog_office - past[1]
+        return f"Trend since {past[0].strftime('%m-%d %H:%M')}: {change:+d}\n"
+
+    def _format_duration(self, seconds: float) -> str:
+        minutes = int(seconds // 60)
+        if minutes < 60:
+            return f"{minutes}m"
+        hours, minutes = divmod(minutes, 60)
+        if hours < 24:
+            return f"{hours}h {minutes}m"
+        days, hours = divmod(hours, 24)
+        return f"{days}d {hours}h"
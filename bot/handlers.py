@@ -1,21 +1,28 @@
 import json
 import logging
 import os
+import re
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Optional
 from telegram import Update
 from telegram.ext import ContextTypes
 from bot.config import WHITELIST_FILE, TIMEZONE
-from bot.alert_manager import AlertManager
+from bot.alert_manager import AlertManager, UPCOMING_PAGE_SIZE
 from bot.sheets_manager import SheetsManager
 
 logger = logging.getLogger(__name__)
 
+RENEW_REPLY_MAX_CHARS = 3500  # stay well under Telegram's 4096-character message limit
+WINDOW_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+MAX_UPCOMING_WINDOW = timedelta(days=365)
+
 class BotHandlers:
     def __init__(self, sheets_manager: SheetsManager, alert_manager: AlertManager):
         self.sheets_manager = sheets_manager
         self.alert_manager = alert_manager
         self.whitelist = self._load_whitelist()
+        self._done_lock = asyncio.Lock()
     
     def _load_whitelist(self) -> set:
         if os.path.exists(WHITELIST_FILE):
@@ -42,9 +49,11 @@ class BotHandlers:
             "Office Telegram Bot\n\n"
             "Available commands:\n"
             "/startmon - Enable monitoring for this group\n"
-            "/renew <email> - Manually renew for specific email\n"
-            "/check - Manually run check for alerts\n\n"
-            "Reply 'done' to any alert to mark it as renewed."
+            "/renew <email> [email ...] - Manually renew one or more emails\n"
+            "/check - Manually run check for alerts\n"
+            "/upcoming <window> - List accounts expiring soon (e.g. 6h, 3d)\n"
+            "/stats - Show expiry capacity, renewal lag and backlog report\n\n"
+            "Tap ✅ Done (or reply 'done') on any alert to mark it as renewed."
         )
     
     async def startmon_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -67,31 +76,78 @@ class BotHandlers:
         else:
             await update.message.reply_text("Monitoring is already enabled for this group!")
     
+    def _parse_emails(self, args: list) -> list:
+        """Split /renew arguments on whitespace, commas and semicolons, keeping order and dropping duplicates"""
+        emails = []
+        seen = set()
+        for arg in args:
+            for token in re.split(r'[,;\s]+', arg):
+                token = token.strip()
+                if token and token.lower() not in seen:
+                    seen.add(token.lower())
+                    emails.append(token)
+        return emails
+    
+    def _format_email_lines(self, header: str, renewed: list, not_found: list) -> str:
+        """Per-email result lines (not found first), truncated to fit in one Telegram message"""
+        lines = [f"❌ {email} (not found)" for email in not_found] + [f"✅ {email}" for email in renewed]
+        reply = header
+        for shown, line in enumerate(lines):
+            if len(reply) + len(line) + 1 > RENEW_REPLY_MAX_CHARS:
+                return reply + f"…and {len(lines) - shown} more"
+            reply += line + "\n"
+        return reply
+    
     async def renew_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not context.args:
-            await update.message.reply_text("Usage: /renew <email>")
+        emails = self._parse_emails(context.args or [])
+        
+        if not emails:
+            await update.message.reply_text("Usage: /renew <email> [email ...]")
             return
         
-        email = ' '.join(context.args)
+        try:
+            rows = self.sheets_manager.find_rows_by_emails(emails)
+        except Exception as e:
+            logger.error(f"Error looking up emails for renewal: {e}")
+            await update.message.reply_text("Failed to read the sheet. Please try again.")
+            return
         
-        row_index = self.sheets_manager.find_row_by_email(email)
+        found = [(email, row) for email, row in rows.items() if row is not None]
+        not_found = [email for email, row in rows.items() if row is None]
         
-        if row_index is None:
-            await update.message.reply_text(f"Email not found: {email}")
-            logger.warning(f"Email not found for renewal: {email}")
+        if not_found:
+            logger.warning(f"Emails not found for renewal: {', '.join(not_found)}")
+        
+        if not found:
+            if len(emails) == 1:
+                await update.message.reply_text(f"Email not found: {emails[0]}")
+            else:
+                await update.message.reply_text(
+                    self._format_email_lines(f"None of the {len(emails)} emails were found:\n", [], not_found)
+                )
             return
         
-        success = self.alert_manager.update_row_after_done(row_index)
+        success = self.alert_manager.update_rows_after_done([row for _, row in found])
         
-        if success:
-            now = datetime.now(TIMEZONE)
+        if not success:
             await update.message.reply_text(
-                f"Successfully renewed for {email}\n"
+                f"Failed to renew {len(found)} account(s). Please try again."
+            )
+            return
+        
+        now = datetime.now(TIMEZONE)
+        if len(emails) == 1:
+            reply = (
+                f"Successfully renewed for {found[0][0]}\n"
                 f"Updated at: {now.strftime('%Y-%m-%d %H:%M:%S')}"
             )
-            logger.info(f"Manual renewal completed for {email} (row {row_index})")
         else:
-            await update.message.reply_text(f"Failed to renew for {email}. Please try again.")
+            header = f"Renewed {len(found)}/{len(emails)} account(s)\n"
+            header += f"Updated at: {now.strftime('%Y-%m-%d %H:%M:%S')}\n"
+            reply = self._format_email_lines(header, [email for email, _ in found], not_found)
+        await update.message.reply_text(reply)
+        logger.info(f"Manual renewal completed for {len(found)} account(s): "
+                    f"{', '.join(f'{email} (row {row})' for email, row in found)}")
     
     async def check_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         status_message = await update.message.reply_text("Running manual check...")
@@ -130,7 +186,8 @@ class BotHandlers:
             sent_message = await context.bot.send_message(
                 chat_id=chat_id,
                 text=message_text,
-                parse_mode='Markdown'
+                parse_mode='Markdown',
+                reply_markup=self.alert_manager.build_done_keyboard(alert)
             )
             self.alert_manager.track_alert_message(
                 sent_message.message_id, 
@@ -146,6 +203,86 @@ class BotHandlers:
         except Exception as e:
             logger.warning(f"Failed to delete status messages: {e}")
     
+    def _parse_window(self, value: str) -> timedelta:
+        """Parse a window like '90m', '6h', '3d' or '1w' (bare numbers are hours, at most 365 days)"""
+        match = re.fullmatch(r'(\d+)\s*([mhdw]?)', value.strip().lower())
+        if not match:
+            raise ValueError(f"Invalid window: {value}")
+        amount, unit = int(match.group(1)), match.group(2) or 'h'
+        try:
+            window = timedelta(**{WINDOW_UNITS[unit]: amount})
+        except OverflowError:
+            raise ValueError(f"Window too large: {value}")
+        if window > MAX_UPCOMING_WINDOW:
+            raise ValueError(f"Window too large: {value}")
+        return window
+    
+    def _format_window(self, window: timedelta) -> str:
+        seconds = int(window.total_seconds())
+        for unit, size in (('d', 86400), ('h', 3600)):
+            if seconds % size == 0:
+                return f"{seconds // size}{unit}"
+        return f"{seconds // 60}m"
+    
+    async def upcoming_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        try:
+            window = self._parse_window(context.args[0]) if context.args else timedelta(hours=24)
+        except ValueError:
+            await update.message.reply_text("Usage: /upcoming <window> (e.g. 90m, 6h, 3d, 1w; at most 365d)")
+            return
+        
+        try:
+            entries, query_start, fetched_at = self.alert_manager.get_upcoming(window)
+        except Exception as e:
+            logger.error(f"Error querying upcoming expiries: {e}")
+            await update.message.reply_text("Failed to read the sheet. Please try again.")
+            return
+        
+        window_seconds = int(window.total_seconds())
+        await update.message.reply_text(
+            self.alert_manager.format_upcoming_message(entries, self._format_window(window), 0, fetched_at),
+            parse_mode='Markdown',
+            reply_markup=self.alert_manager.build_upcoming_keyboard(len(entries), window_seconds, query_start, 0)
+        )
+    
+    async def handle_upcoming_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.callback_query
+        await query.answer()
+        
+        try:
+            _, window_seconds, query_start, page = query.data.split(':')
+            window_seconds, query_start, page = int(window_seconds), int(query_start), int(page)
+            # Same start time and (while cached) same index as the original query: no refetch, no shifting rows
+            entries, _, fetched_at = self.alert_manager.get_upcoming(timedelta(seconds=window_seconds), query_start)
+        except Exception as e:
+            logger.warning(f"Failed to handle upcoming page {query.data}: {e}")
+            return
+        
+        # Clamp in case the query fell out of the cache and the current index has fewer rows
+        last_page = max(0, (len(entries) - 1) // UPCOMING_PAGE_SIZE)
+        page = min(page, last_page)
+        
+        try:
+            await query.edit_message_text(
+                self.alert_manager.format_upcoming_message(
+                    entries, self._format_window(timedelta(seconds=window_seconds)), page, fetched_at
+                ),
+                parse_mode='Markdown',
+                reply_markup=self.alert_manager.build_upcoming_keyboard(len(entries), window_seconds, query_start, page)
+            )
+        except Exception as e:
+            logger.warning(f"Failed to edit upcoming message: {e}")
+    
+    async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        try:
+            message_text = self.alert_manager.format_stats_message()
+        except Exception as e:
+            logger.error(f"Error computing stats: {e}")
+            await update.message.reply_text("Failed to read the sheet. Please try again.")
+            return
+        
+        await update.message.reply_text(message_text)
+    
     async def handle_done_reply(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         message = update.message
         
@@ -195,6 +332,61 @@ class BotHandlers:
         else:
             await message.reply_text("Failed to update. Please try again or use /renew command.")
     
+    async def handle_done_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.callback_query
+        parsed = self.alert_manager.parse_done_callback(query.data)
+        
+        if parsed is None:
+            await query.answer()
+            return
+        
+        row_index, fingerprint = parsed
+        chat_id = query.message.chat.id
+        message_id = query.message.message_id
+        email = self.alert_manager.get_email_from_message(message_id, getattr(query.message, 'text', None))
+        
+        # Answer first so the button stops spinning, then queue the sheet write.
+        # The alert is only deleted once the write succeeds, so a failure leaves it in place.
+        await query.answer("⏳ Updating the sheet...")
+        context.application.create_task(
+            self._apply_done_callback(context, chat_id, message_id, row_index, fingerprint, email)
+        )
+    
+    async def _apply_done_callback(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_id: int,
+                                   row_index: int, fingerprint: str, email: Optional[str]):
+        # The Google client is synchronous: run it off the event loop, one button write at a time
+        async with self._done_lock:
+            matches = await asyncio.to_thread(self.alert_manager.verify_row_fingerprint, row_index, fingerprint)
+            success = False
+            if matches:
+                success = await asyncio.to_thread(self.alert_manager.update_row_after_done, row_index)
+        
+        account = email or f"row {row_index}"
+        renew_hint = f"/renew {email}" if email else "/renew <email>"
+        
+        if success:
+            logger.info(f"Renewal via 'Done' button for row {row_index} ({account})")
+            try:
+                await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
+                self.alert_manager.remove_message_tracking(message_id)
+                logger.info(f"Deleted alert message {message_id} after 'Done' button")
+            except Exception as e:
+                logger.warning(f"Failed to delete alert message {message_id}: {e}")
+            return
+        
+        if matches is None:
+            text = f"Could not read the sheet for {account}. Please tap Done again or use {renew_hint}."
+        elif not matches:
+            logger.warning(f"Row {row_index} no longer matches fingerprint {fingerprint}, skipping update")
+            text = f"Row {row_index} changed since the alert for {account} was sent. Please use {renew_hint}."
+        else:
+            text = f"Failed to update {account}. Please tap Done again or use {renew_hint}."
+        
+        try:
+            await context.bot.send_message(chat_id=chat_id, text=text, reply_to_message_id=message_id)
+        except Exception as e:
+            logger.warning(f"Failed to report 'Done' failure for row {row_index}: {e}")
+    
     def get_whitelisted_groups(self) -> set:
         return self.whitelist
 
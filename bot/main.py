@@ -1,6 +1,6 @@
 import logging
 import asyncio
-from telegram.ext import Application, CommandHandler, MessageHandler, filters
+from telegram.ext import Application, CallbackQueryHandler, CommandHandler, MessageHandler, filters
 from bot.config import TELEGRAM_BOT_TOKEN
 from bot.sheets_manager import SheetsManager
 from bot.alert_manager import AlertManager
@@ -22,6 +22,8 @@ def main():
     
     alert_manager = AlertManager(sheets_manager)
     logger.info("Alert manager initialized")
+    if alert_manager.snapshot:
+        logger.info(f"Warm start from snapshot of {len(alert_manager.snapshot.rows)} rows")
     
     application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
     
@@ -31,11 +33,21 @@ def main():
     application.add_handler(CommandHandler('startmon', bot_handlers.startmon_command))
     application.add_handler(CommandHandler('renew', bot_handlers.renew_command))
     application.add_handler(CommandHandler('check', bot_handlers.check_command))
+    application.add_handler(CommandHandler('upcoming', bot_handlers.upcoming_command))
+    application.add_handler(CommandHandler('stats', bot_handlers.stats_command))
     
     application.add_handler(MessageHandler(
         filters.TEXT & filters.REPLY & ~filters.COMMAND,
         bot_handlers.handle_done_reply
     ))
+    application.add_handler(CallbackQueryHandler(
+        bot_handlers.handle_done_callback,
+        pattern=r'^done:'
+    ))
+    application.add_handler(CallbackQueryHandler(
+        bot_handlers.handle_upcoming_callback,
+        pattern=r'^upcoming:'
+    ))
     
     logger.info("Handlers registered")
     
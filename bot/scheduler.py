@@ -71,7 +71,8 @@ class AlertScheduler:
                     sent_message = await self.bot_application.bot.send_message(
                         chat_id=group_id,
                         text=message_text,
-                        parse_mode='Markdown'
+                        parse_mode='Markdown',
+                        reply_markup=self.alert_manager.build_done_keyboard(alert)
                     )
                     self.alert_manager.track_alert_message(
                         sent_message.message_id, 
@@ -109,6 +110,30 @@ class AlertScheduler:
             except Exception as e:
                 logger.error(f"Error sending daily summary to group {group_id}: {e}")
     
+    async def stats_report(self):
+        """Send the weekly expiry stats report (Monday 7:05 AM)"""
+        logger.info("Running weekly stats report...")
+        
+        if not self.whitelisted_groups:
+            logger.info("No whitelisted groups. Skipping stats report.")
+            return
+        
+        try:
+            message_text = self.alert_manager.format_stats_message()
+        except Exception as e:
+            logger.error(f"Error computing stats report: {e}")
+            return
+        
+        for group_id in self.whitelisted_groups:
+            try:
+                await self.bot_application.bot.send_message(
+                    chat_id=group_id,
+                    text=message_text
+                )
+                logger.info(f"Stats report sent to group {group_id}")
+            except Exception as e:
+                logger.error(f"Error sending stats report to group {group_id}: {e}")
+    
     def start(self):
         # Regular interval check (every 15 minutes)
         self.scheduler.add_job(
@@ -128,8 +153,18 @@ class AlertScheduler:
             replace_existing=True
         )
         
+        # Weekly stats report on Monday at 7:05 AM, after the daily summary
+        self.scheduler.add_job(
+            self.stats_report,
+            trigger=CronTrigger(day_of_week='mon', hour=7, minute=5, timezone=TIMEZONE),
+            id='stats_report',
+            name='Weekly stats report',
+            replace_existing=True
+        )
+        
         self.scheduler.start()
-        logger.info(f"Scheduler started. Regular checks every {CHECK_INTERVAL_MINUTES} minutes, Daily summary at 7:00 AM")
+        logger.info(f"Scheduler started. Regular checks every {CHECK_INTERVAL_MINUTES} minutes, Daily summary at 7:00 AM, "
+                    f"Stats report Monday 7:05 AM")
     
     def stop(self):
         self.scheduler.shutdown()
@@ -0,0 +1,133 @@
+import logging
+from datetime import date
+from functools import cached_property
+from typing import List, Optional, Tuple
+import numpy as np
+from bot.snapshot_store import SheetSnapshot
+
+logger = logging.getLogger(__name__)
+
+ZERO = ord('0')
+COLON = ord(':')
+DASH = ord('-')
+
+def parse_renewal_date(value: str) -> Optional[date]:
+    """Parse a column G renewal date written as YYYY-MM-DD; None if empty or in another format"""
+    try:
+        return date.fromisoformat(value.strip())
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+def _code_points(values: List[str], width: int) -> np.ndarray:
+    """Fixed-width code point matrix with one extra sentinel column, so longer strings can be rejected"""
+    return np.array(values, dtype=f'U{width + 1}').view(np.uint32).reshape(len(values), width + 1)
+
+def _number(codes: np.ndarray, columns: List[int]) -> np.ndarray:
+    result = np.zeros(len(codes), dtype=np.int64)
+    for col in columns:
+        result = result * 10 + codes[:, col].astype(np.int64) - ZERO
+    return result
+
+def _all_digits(codes: np.ndarray, columns: List[int]) -> np.ndarray:
+    digits = codes[:, columns]
+    return ((digits >= ZERO) & (digits <= ZERO + 9)).all(axis=1)
+
+class SheetColumns:
+    """Columns A, C, G, H and I of one snapshot parsed into NumPy arrays.
+    Built once per snapshot and shared by ExpiryIndex and ExpiryStats; the columns only /stats needs
+    (C, G, normalized emails) are parsed on first use, so the 15-minute scan doesn't pay for them."""
+
+    def __init__(self, snapshot: SheetSnapshot):
+        self.fetched_at = snapshot.fetched_at
+        self._rows = rows = snapshot.rows[1:]
+        n = len(rows)
+        self.row_index = np.arange(2, n + 2)
+        column = self._column
+
+        self.emails = [row[0] if row else '' for row in rows]
+        self.c_values = [row[2] if len(row) > 2 else '' for row in rows]
+
+        # H: optional leading '-' followed by up to 18 digits (fits int64)
+        h_codes = _code_points(column(7), 19)
+        h_length = np.count_nonzero(h_codes, axis=1)
+        negative = h_codes[:, 0] == DASH
+        positions = np.arange(h_codes.shape[1])
+        in_body = (positions >= negative[:, None]) & (positions < h_length[:, None])
+        is_digit = (h_codes >= ZERO) & (h_codes <= ZERO + 9)
+        h_ok = ((h_length > negative) & (h_length - negative <= 18) & (h_codes[:, -1] == 0) &
+                ~(in_body & ~is_digit).any(axis=1))
+        # Horner's rule across the character columns (a loop over width, not rows)
+        magnitude = np.zeros(n, dtype=np.int64)
+        for pos in positions:
+            digit = h_codes[:, pos].astype(np.int64) - ZERO
+            magnitude = np.where(in_body[:, pos], magnitude * 10 + digit, magnitude)
+        self.h_days = np.where(h_ok, np.where(negative, -magnitude, magnitude), 0)
+
+        # I: HH:MM:SS; a single-digit hour (H:MM:SS) is shifted right and zero-filled
+        i_codes = _code_points(column(8), 8)
+        short = np.count_nonzero(i_codes, axis=1) == 7
+        i_codes[short, 1:8] = i_codes[short, 0:7]
+        i_codes[short, 0] = ZERO
+        hours = _number(i_codes, [0, 1])
+        minutes = _number(i_codes, [3, 4])
+        seconds = _number(i_codes, [6, 7])
+        i_ok = (_all_digits(i_codes, [0, 1, 3, 4, 6, 7]) & (i_codes[:, 2] == COLON) & (i_codes[:, 5] == COLON) &
+                (i_codes[:, 8] == 0) & (hours < 24) & (minutes < 60) & (seconds < 60))
+        self.i_seconds = np.where(i_ok, hours * 3600 + minutes * 60 + seconds, 0)
+
+        # Same rules as check_for_alerts: email, H and I present and parseable
+        self.valid = np.fromiter(map(bool, self.emails), dtype=bool, count=n) & h_ok & i_ok
+
+        logger.info(f"Parsed {n} rows into columns")
+
+    def _column(self, pos: int) -> List[str]:
+        # Splitting the rows into columns is the only per-row Python work; parsing is array math
+        return [row[pos].strip() if len(row) > pos else '' for row in self._rows]
+
+    @cached_property
+    def is_copilot(self) -> np.ndarray:
+        return np.array(['copilot' in c.lower() for c in self.c_values], dtype=bool)
+
+    @cached_property
+    def email_keys(self) -> np.ndarray:
+        return np.array([email.strip().lower() for email in self.emails], dtype=str)
+
+    @cached_property
+    def _renewal_dates(self) -> Tuple[np.ndarray, int]:
+        # G: YYYY-MM-DD, validated by round-tripping the day through its month
+        g_codes = _code_points(self._column(6), 10)
+        year = _number(g_codes, [0, 1, 2, 3])
+        month = _number(g_codes, [5, 6])
+        day = _number(g_codes, [8, 9])
+        g_ok = (_all_digits(g_codes, [0, 1, 2, 3, 5, 6, 8, 9]) & (g_codes[:, 4] == DASH) & (g_codes[:, 7] == DASH) &
+                (g_codes[:, 10] == 0) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31))
+        months = np.where(g_ok, (year - 1970) * 12 + month - 1, 0).astype('datetime64[M]')
+        days = months.astype('datetime64[D]') + np.where(g_ok, day - 1, 0)
+        g_ok &= days.astype('datetime64[M]') == months
+        g_days = np.where(g_ok, days.astype(np.int64), -1)
+        unparsed = int(np.count_nonzero(self.valid & (g_codes[:, 0] != 0) & ~g_ok))
+        return g_days, unparsed
+
+    @property
+    def g_days(self) -> np.ndarray:
+        """Column G as days since 1970-01-01, -1 where empty or unreadable"""
+        return self._renewal_dates[0]
+
+    @property
+    def unparsed_renewal_dates(self) -> int:
+        """Valid rows whose G value is present but not YYYY-MM-DD"""
+        return self._renewal_dates[1]
+
+    def lookup_times(self, times_by_email: dict) -> np.ndarray:
+        """Epoch seconds from a lowercase-email -> datetime map for every row (NaN where missing)"""
+        result = np.full(len(self.emails), np.nan)
+        if not times_by_email or not self.emails:
+            return result
+        keys = np.array(list(times_by_email.keys()), dtype=str)
+        values = np.array([when.timestamp() for when in times_by_email.values()])
+        order = np.argsort(keys)
+        keys, values = keys[order], values[order]
+        positions = np.minimum(np.searchsorted(keys, self.email_keys), len(keys) - 1)
+        found = keys[positions] == self.email_keys
+        result[found] = values[positions[found]]
+        return result
@@ -1,5 +1,8 @@
 import logging
+import threading
+import httplib2
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from typing import List, Dict, Optional, Tuple
@@ -14,9 +17,19 @@ class SheetsManager:
         self.credentials = service_account.Credentials.from_service_account_file(
             GOOGLE_CREDENTIALS_PATH, scopes=SCOPES
         )
-        self.service = build('sheets', 'v4', credentials=self.credentials)
+        self._local = threading.local()
         self.spreadsheet_id = GOOGLE_SHEET_ID
         self.sheet_name = GOOGLE_SHEET_NAME
+    
+    @property
+    def service(self):
+        """Sheets client for the calling thread; httplib2 connections are not thread-safe"""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http())
+            service = build('sheets', 'v4', http=http, cache_discovery=False)
+            self._local.service = service
+        return service
         
     def get_sheet_data(self, range_name: str = 'A:I') -> List[List[str]]:
         try:
@@ -94,14 +107,43 @@ class SheetsManager:
             logger.error(f"Error updating row {row_index}: {error}")
             return False
     
-    def find_row_by_email(self, email: str) -> Optional[int]:
+    def update_rows(self, row_indices: List[int], date_value: str, time_value: str) -> bool:
+        """Write the same G/I values to many rows in a single batchUpdate"""
+        if not row_indices:
+            return True
         try:
-            values = self.get_sheet_data('A:A')
-            for idx, row in enumerate(values, start=1):
-                if row and row[0].strip().lower() == email.strip().lower():
-                    return idx
-            return None
-        except Exception as error:
-            logger.error(f"Error finding email {email}: {error}")
-            return None
-
+            data = []
+            for row_index in row_indices:
+                data.append({
+                    'range': f"'{self.sheet_name}'!G{row_index}",
+                    'values': [[date_value]]
+                })
+                data.append({
+                    'range': f"'{self.sheet_name}'!I{row_index}",
+                    'values': [[time_value]]
+                })
+            
+            body = {
+                'valueInputOption': 'USER_ENTERED',
+                'data': data
+            }
+            
+            self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body=body
+            ).execute()
+            
+            logger.info(f"Updated {len(row_indices)} rows: G={date_value}, I={time_value}")
+            return True
+        except HttpError as error:
+            logger.error(f"Error updating rows {row_indices}: {error}")
+            return False
+    
+    def find_rows_by_emails(self, emails: List[str]) -> Dict[str, Optional[int]]:
+        """Resolve many emails against a single column A fetch"""
+        values = self.get_sheet_data('A:A')
+        index = {}
+        for idx, row in enumerate(values, start=1):
+            if row:
+                index.setdefault(row[0].strip().lower(), idx)
+        return {email: index.get(email.strip().lower()) for email in emails}
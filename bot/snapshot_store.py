@@ -0,0 +1,67 @@
+import json
+import logging
+import os
+import struct
+import zlib
+from datetime import datetime
+from typing import List, Optional
+from bot.config import TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+# File layout: magic, format version, fetched_at (epoch seconds), then zlib-compressed JSON rows
+SNAPSHOT_MAGIC = b'OTBS'
+SNAPSHOT_VERSION = 1
+HEADER = struct.Struct('>4sBd')
+
+class SheetSnapshot:
+    def __init__(self, rows: List[List[str]], fetched_at: datetime):
+        self.rows = rows
+        self.fetched_at = fetched_at
+
+class SnapshotStore:
+    """Persists the latest A:I sheet data so restarts are warm and Sheets outages still have data"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def save(self, rows: List[List[str]]) -> SheetSnapshot:
+        snapshot = SheetSnapshot(rows, datetime.now(TIMEZONE))
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            payload = zlib.compress(json.dumps(rows, separators=(',', ':')).encode('utf-8'))
+            header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, snapshot.fetched_at.timestamp())
+
+            # Write next to the target and rename so readers never see a partial file.
+            # The snapshot includes passwords (column B), so keep it owner-only.
+            tmp_path = f"{self.path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.fchmod(fd, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            logger.info(f"Saved snapshot of {len(rows)} rows ({HEADER.size + len(payload)} bytes)")
+        except Exception as e:
+            logger.error(f"Error saving snapshot: {e}")
+        return snapshot
+
+    def load(self) -> Optional[SheetSnapshot]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            magic, version, fetched_at = HEADER.unpack_from(data)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                logger.warning(f"Ignoring snapshot with unknown format: {self.path}")
+                return None
+            rows = json.loads(zlib.decompress(data[HEADER.size:]).decode('utf-8'))
+            snapshot = SheetSnapshot(rows, datetime.fromtimestamp(fetched_at, TIMEZONE))
+            logger.info(f"Loaded snapshot of {len(rows)} rows from {snapshot.fetched_at.strftime('%Y-%m-%d %H:%M:%S')}")
+            return snapshot
+        except Exception as e:
+            logger.error(f"Error loading snapshot: {e}")
+            return None